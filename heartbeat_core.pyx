@@ -0,0 +1,191 @@
+# cython: language_level=3, boundscheck=False, wraparound=False, cdivision=True
+"""
+Compiled core of the Heartbeat Monitoring System
+
+Build in place with:  cythonize -i heartbeat_core.pyx
+main.py uses this module automatically when it can be imported.
+"""
+
+from libc.stdint cimport int64_t
+
+import numpy as np
+
+
+cdef int _digits(str s, Py_ssize_t start, Py_ssize_t count):
+    # Value of the ASCII digits in s[start:start + count], or -1.
+    cdef int value = 0
+    cdef Py_ssize_t i
+    cdef int digit
+    for i in range(start, start + count):
+        digit = <int>(<Py_UCS4>s[i]) - 48  # ord('0')
+        if digit < 0 or digit > 9:
+            return -1
+        value = value * 10 + digit
+    return value
+
+
+cdef int _days_in_month(int year, int month):
+    if month == 2:
+        if year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+            return 29
+        return 28
+    if month == 4 or month == 6 or month == 9 or month == 11:
+        return 30
+    return 31
+
+
+cdef int64_t _days_from_civil(int64_t year, int64_t month, int64_t day):
+    # Days since 1970-01-01 in the proleptic Gregorian calendar, for year >= 1.
+    cdef int64_t era, year_of_era, day_of_year, day_of_era
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_year = (153 * (month - 3 if month > 2 else month + 9) + 2) // 5 + day - 1
+    day_of_era = year_of_era * 365 + year_of_era // 4 - year_of_era // 100 + day_of_year
+    return era * 146097 + day_of_era - 719468
+
+
+cdef bint _parse_iso_to_epoch(str s, int64_t *epoch):
+    # Handles YYYY-MM-DDTHH:MM:SS with an optional 'Z' or +HH:MM/-HH:MM suffix
+    # (naive times are UTC). Anything else returns False so the caller can fall
+    # back to the Python parser, which decides whether the string is valid.
+    cdef Py_ssize_t n = len(s)
+    cdef int year, month, day, hour, minute, second, offset_hours, offset_minutes
+    cdef int64_t offset = 0
+    cdef Py_UCS4 c
+
+    if n != 19 and n != 20 and n != 25:
+        return False
+    if s[4] != u'-' or s[7] != u'-' or s[13] != u':' or s[16] != u':':
+        return False
+    c = s[10]
+    if c != u'T' and c != u' ':
+        return False
+
+    year = _digits(s, 0, 4)
+    month = _digits(s, 5, 2)
+    day = _digits(s, 8, 2)
+    hour = _digits(s, 11, 2)
+    minute = _digits(s, 14, 2)
+    second = _digits(s, 17, 2)
+    if year < 1 or month < 1 or month > 12:
+        return False
+    if day < 1 or day > _days_in_month(year, month):
+        return False
+    if hour < 0 or hour > 23 or minute < 0 or minute > 59 or second < 0 or second > 59:
+        return False
+
+    if n == 20:
+        if s[19] != u'Z':
+            return False
+    elif n == 25:
+        c = s[19]
+        if (c != u'+' and c != u'-') or s[22] != u':':
+            return False
+        offset_hours = _digits(s, 20, 2)
+        offset_minutes = _digits(s, 23, 2)
+        if offset_hours < 0 or offset_hours > 23 or offset_minutes < 0 or offset_minutes > 59:
+            return False
+        offset = offset_hours * 3600 + offset_minutes * 60
+        if c == u'-':
+            offset = -offset
+
+    epoch[0] = (_days_from_civil(year, month, day) * 86400
+                + hour * 3600 + minute * 60 + second - offset)
+    return True
+
+
+cdef object _sorted_array(list timestamps):
+    cdef object arr = np.array(timestamps, dtype=np.int64)
+    cdef const int64_t[:] view = arr
+    cdef Py_ssize_t i, descents = 0
+    with nogil:
+        for i in range(1, view.shape[0]):
+            if view[i] < view[i - 1]:
+                descents += 1
+    if descents == 0:
+        return arr
+    # Timsort for nearly ordered logs, introsort for shuffled ones.
+    if descents * 64 < view.shape[0]:
+        arr.sort(kind='stable')
+    else:
+        arr.sort()
+    return arr
+
+
+cpdef dict group_and_sort(object events, object parse_fallback):
+    """
+    Group valid events into a sorted int64 array of epoch seconds per service.
+
+    parse_fallback(timestamp_str) is called for timestamps the built-in parser
+    does not handle and returns epoch seconds or None for invalid ones.
+    """
+    cdef dict service_events = {}
+    cdef list timestamps
+    cdef int64_t epoch = 0
+    for event in events:
+        if not isinstance(event, dict):
+            continue
+        service = (<dict>event).get('service')
+        if not service:
+            continue
+        timestamp = (<dict>event).get('timestamp')
+        if not isinstance(timestamp, str):
+            continue
+        if not _parse_iso_to_epoch(<str>timestamp, &epoch):
+            fallback_epoch = parse_fallback(timestamp)
+            if fallback_epoch is None:
+                continue
+            epoch = fallback_epoch
+        timestamps = service_events.get(service)
+        if timestamps is None:
+            timestamps = []
+            service_events[service] = timestamps
+        timestamps.append(epoch)
+
+    for service in list(service_events):
+        service_events[service] = _sorted_array(service_events[service])
+    return service_events
+
+
+cpdef object detect(const int64_t[:] timestamps, int64_t interval, int64_t allowed_misses):
+    """
+    Return the epoch seconds of every missed-heartbeat alert as an int64 array.
+    """
+    cdef Py_ssize_t i, n_events = timestamps.shape[0]
+    cdef int64_t expected_time, misses, n, n_alerts = 0
+    cdef int64_t[:] out
+    if interval <= 0:
+        raise ValueError("interval must be positive")
+    if allowed_misses < 1:
+        allowed_misses = 1
+    if n_events == 0:
+        return np.empty(0, dtype=np.int64)
+
+    # First pass counts alerts so the second can fill an exactly sized array.
+    with nogil:
+        expected_time = timestamps[0]
+        for i in range(1, n_events):
+            expected_time += interval
+            if timestamps[i] > expected_time:
+                misses = (timestamps[i] - expected_time + interval - 1) // interval
+                n_alerts += misses // allowed_misses
+                expected_time += misses * interval
+
+    alerts = np.empty(n_alerts, dtype=np.int64)
+    out = alerts
+    n_alerts = 0
+    with nogil:
+        expected_time = timestamps[0]
+        for i in range(1, n_events):
+            expected_time += interval
+            if timestamps[i] > expected_time:
+                misses = (timestamps[i] - expected_time + interval - 1) // interval
+                n = allowed_misses
+                while n <= misses:
+                    out[n_alerts] = expected_time + (n - 1) * interval
+                    n_alerts += 1
+                    n += allowed_misses
+                expected_time += misses * interval
+    return alerts
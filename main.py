@@ -3,96 +3,379 @@
 Heartbeat Monitoring System
 """
 
+import functools
+import itertools
 import json
-from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
+import multiprocessing
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Sequence, Tuple
 import argparse
 
+try:
+    import orjson
+
+    def _loads(data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def _dumps_line(obj: Any) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _loads(data: bytes) -> Any:
+        return json.loads(data)
+
+    def _dumps_line(obj: Any) -> bytes:
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    # Compiled core; see heartbeat_core.pyx for how to build it.
+    import heartbeat_core
+except ImportError:
+    heartbeat_core = None
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+# The only event fields HeartbeatMonitor reads; everything else is left unparsed.
+_PROJECTED_KEYS = ('service', 'timestamp')
+
+# Inputs below these sizes always run in this process, even when worker
+# processes are requested.
+_PARALLEL_MIN_SERVICES = 8
+_PARALLEL_MIN_EVENTS = 1_000_000
+
+# Date and time of day (to the minute) that every accepted timestamp starts with.
+_ISO_PREFIX = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}', re.ASCII)
+
+try:
+    # C parser; handles the 'Z' suffix and reuses timezone objects.
+    from ciso8601 import parse_datetime as _fromisoformat
+except ImportError:
+    if sys.version_info >= (3, 11):
+        # datetime.fromisoformat accepts a trailing 'Z' from Python 3.11 onwards.
+        _fromisoformat = datetime.fromisoformat
+    else:
+        def _fromisoformat(timestamp_str: str) -> datetime:
+            if timestamp_str.endswith('Z'):
+                timestamp_str = timestamp_str[:-1] + '+00:00'
+            return datetime.fromisoformat(timestamp_str)
+
+
+# Timestamps recur across services and duplicate events; bounded so a huge log
+# of unique timestamps cannot grow the cache without limit.
+@functools.lru_cache(maxsize=1 << 16)
+def _parse_iso(timestamp_str: str) -> Optional[datetime]:
+    # Cheap structural check first; a failing parse raises and unwinds.
+    if not _ISO_PREFIX.match(timestamp_str):
+        return None
+    # ciso8601 also accepts hour 24 and a lowercase 'z'; rejecting them means
+    # it never widens what fromisoformat accepts (it may still reject a few
+    # strings fromisoformat allows, such as '10:00:00 Z').
+    if timestamp_str[11:13] == '24' or timestamp_str.endswith('z'):
+        return None
+    try:
+        return _fromisoformat(timestamp_str)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _to_epoch(dt: datetime) -> int:
+    # Naive timestamps are taken to be UTC.
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _format_epoch(ts: int) -> str:
+    # UTC ISO 8601 string built straight from the epoch, without a datetime.
+    t = time.gmtime(ts)
+    return (f"{t.tm_year:04d}-{t.tm_mon:02d}-{t.tm_mday:02d}"
+            f"T{t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}Z")
+
+
+def _sorted_array(timestamps: List[int]) -> 'np.ndarray':
+    arr = np.array(timestamps, dtype=np.int64)
+    descents = np.count_nonzero(arr[1:] < arr[:-1])
+    if descents == 0:
+        return arr
+    # Heartbeat logs are usually close to chronological. numpy's stable sort
+    # (Timsort for int64) is near-linear on such runs but much slower than
+    # the default introsort on shuffled input.
+    if descents * 64 < len(arr):
+        arr.sort(kind='stable')
+    else:
+        arr.sort()
+    return arr
+
+
+def _detect_numpy(timestamps: 'np.ndarray', interval: int, allowed_misses: int) -> List[int]:
+    # Expected heartbeats sit on a grid anchored at the first timestamp. Each
+    # heartbeat consumes the next grid slot, or the first slot at or after it
+    # if it arrives late, so slot[i] = max(slot[i-1] + 1, ceil(offset / interval)).
+    # Subtracting the index turns that recurrence into a running maximum.
+    start = timestamps[0]
+    index = np.arange(len(timestamps))
+    slots = np.maximum.accumulate(-((start - timestamps) // interval) - index) + index
+    misses = np.diff(slots) - 1
+
+    # Alerting on zero misses behaves like alerting on every miss.
+    allowed_misses = max(allowed_misses, 1)
+    late = np.flatnonzero(misses >= allowed_misses)
+    if len(late) == 0:
+        return []
+
+    alerts = []
+    for gap in late.tolist():
+        last_slot = int(slots[gap])
+        for n in range(1, int(misses[gap]) // allowed_misses + 1):
+            alerts.append(int(start) + (last_slot + n * allowed_misses) * interval)
+    return alerts
+
+
+def _detect_kernel(timestamps: 'np.ndarray', interval: int, allowed_misses: int) -> 'np.ndarray':
+    # Compiled with numba.njit; allowed_misses must be at least 1. The first
+    # pass counts alerts so the second can fill an exactly sized buffer.
+    n_alerts = 0
+    expected_time = timestamps[0]
+    for i in range(1, len(timestamps)):
+        expected_time += interval
+        if timestamps[i] > expected_time:
+            misses = (timestamps[i] - expected_time + interval - 1) // interval
+            n_alerts += misses // allowed_misses
+            expected_time += misses * interval
+
+    alerts = np.empty(n_alerts, np.int64)
+    n_alerts = 0
+    expected_time = timestamps[0]
+    for i in range(1, len(timestamps)):
+        expected_time += interval
+        if timestamps[i] > expected_time:
+            misses = (timestamps[i] - expected_time + interval - 1) // interval
+            for n in range(1, misses // allowed_misses + 1):
+                alerts[n_alerts] = expected_time + (n * allowed_misses - 1) * interval
+                n_alerts += 1
+            expected_time += misses * interval
+    return alerts
+
+
+_detect_jit = None
+
+
+def _get_detect_jit():
+    # Importing numba is slow, so only do it once detection is first needed.
+    global _detect_jit
+    if _detect_jit is None:
+        try:
+            import numba
+        except ImportError:
+            _detect_jit = False
+        else:
+            _detect_jit = numba.njit(cache=True)(_detect_kernel)
+    return _detect_jit
+
+
+def _detect_missed(timestamps: Sequence[int], interval: int, allowed_misses: int) -> List[int]:
+    if len(timestamps) == 0:
+        return []
+    if np is not None and isinstance(timestamps, np.ndarray):
+        if heartbeat_core is not None:
+            return heartbeat_core.detect(timestamps, interval, max(allowed_misses, 1)).tolist()
+        detect_jit = _get_detect_jit()
+        if detect_jit:
+            return detect_jit(timestamps, interval, max(allowed_misses, 1)).tolist()
+        return _detect_numpy(timestamps, interval, allowed_misses)
+
+    alerts = []
+    append_alert = alerts.append
+    allowed_misses = max(allowed_misses, 1)
+    expected_time = timestamps[0]
+
+    for actual_time in itertools.islice(timestamps, 1, None):
+        expected_time += interval
+        if actual_time <= expected_time:
+            continue
+        # Late heartbeat: count every expected heartbeat it skipped over in
+        # one step and emit an alert for each run of allowed_misses of them.
+        misses = (actual_time - expected_time + interval - 1) // interval
+        for n in range(allowed_misses, misses + 1, allowed_misses):
+            append_alert(expected_time + (n - 1) * interval)
+        expected_time += misses * interval
+
+    return alerts
+
+
+def _detect_service(task: Tuple[str, Sequence[int], int, int]) -> Tuple[str, List[int]]:
+    # Module-level so multiprocessing can pickle it for worker processes.
+    service, timestamps, interval, allowed_misses = task
+    return service, _detect_missed(timestamps, interval, allowed_misses)
+
 
 class HeartbeatMonitor:
-    def __init__(self, expected_interval_seconds: int = 60, allowed_misses: int = 3):
+    def __init__(self, expected_interval_seconds: int = 60, allowed_misses: int = 3,
+                 processes: Optional[int] = 1):
         self.expected_interval_seconds = expected_interval_seconds
         self.allowed_misses = allowed_misses
+        # Worker processes for detection on large inputs: 1 keeps everything
+        # in this process, None uses one per CPU.
+        self.processes = processes
 
     def parse_timestamp(self, timestamp_str: Optional[str]) -> Optional[datetime]:
         if not isinstance(timestamp_str, str):
             return None
-        try:
-            return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-        except (ValueError, TypeError, AttributeError):
-            return None
+        return _parse_iso(timestamp_str)
 
-    def validate_event(self, event: Dict[str, Any]) -> bool:
+    def _validate_and_parse(self, event: Dict[str, Any]) -> Optional[datetime]:
         if not isinstance(event, dict):
-            return False
+            return None
         if 'service' not in event or not event['service']:
-            return False
+            return None
         if 'timestamp' not in event:
-            return False
-        return self.parse_timestamp(event['timestamp']) is not None
+            return None
+        return self.parse_timestamp(event['timestamp'])
+
+    def validate_event(self, event: Dict[str, Any]) -> bool:
+        return self._validate_and_parse(event) is not None
 
-    def sort_events_by_service(self, events: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
-        service_events = {}
+    def _parse_epoch(self, timestamp_str: str) -> Optional[int]:
+        parsed_timestamp = self.parse_timestamp(timestamp_str)
+        return None if parsed_timestamp is None else _to_epoch(parsed_timestamp)
+
+    def sort_events_by_service(self, events: Iterable[Dict[str, Any]]) -> Dict[str, Sequence[int]]:
+        if heartbeat_core is not None:
+            return heartbeat_core.group_and_sort(events, self._parse_epoch)
+        service_events = defaultdict(list)
+        # Bind hot-loop lookups to locals once rather than once per event.
+        validate_and_parse = self._validate_and_parse
+        to_epoch = _to_epoch
         for event in events:
-            if not self.validate_event(event):
+            parsed_timestamp = validate_and_parse(event)
+            if parsed_timestamp is None:
                 continue
-            service = event['service']
-            if service not in service_events:
-                service_events[service] = []
-            event_copy = event.copy()
-            event_copy['parsed_timestamp'] = self.parse_timestamp(event['timestamp'])
-            service_events[service].append(event_copy)
-        for service in service_events:
-            service_events[service].sort(key=lambda x: x['parsed_timestamp'])
-        return service_events
-
-    def detect_missed_heartbeats(self, service_events: List[Dict[str, Any]]) -> List[datetime]:
-        if not service_events:
-            return []
-
-        alerts = []
-        interval = timedelta(seconds=self.expected_interval_seconds)
-        expected_time = service_events[0]['parsed_timestamp']
-        event_index = 1
-        consecutive_misses = 0
-
-        while event_index < len(service_events):
-            expected_time += interval
-            actual_time = service_events[event_index]['parsed_timestamp']
-
-            if actual_time <= expected_time:
-                consecutive_misses = 0
-                event_index += 1
+            service_events[event['service']].append(to_epoch(parsed_timestamp))
+        for service, timestamps in service_events.items():
+            if np is not None:
+                service_events[service] = _sorted_array(timestamps)
             else:
-                consecutive_misses += 1
-                if consecutive_misses >= self.allowed_misses:
-                    alerts.append(expected_time)
-                    consecutive_misses = 0
-
-        return alerts
-
-    def monitor_heartbeats(self, events: List[Dict[str, Any]]) -> List[Dict[str, str]]:
-        service_events_map = self.sort_events_by_service(events)
-        alerts = []
-        for service, events_list in service_events_map.items():
-            service_alerts = self.detect_missed_heartbeats(events_list)
-            for alert_time in service_alerts:
-                alerts.append({
-                    'service': service,
-                    'alert_at': alert_time.isoformat().replace('+00:00', 'Z')
-                })
-        return alerts
+                timestamps.sort()
+        return dict(service_events)
+
+    def detect_missed_heartbeats(self, timestamps: Sequence[int]) -> List[int]:
+        return _detect_missed(timestamps, self.expected_interval_seconds, self.allowed_misses)
+
+    def iter_alerts(self, events: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, str]]:
+        yield from self.iter_grouped_alerts(self.sort_events_by_service(events))
+
+    def iter_grouped_alerts(self, service_events_map: Dict[str, Sequence[int]]) -> Iterator[Dict[str, str]]:
+        n_events = sum(len(timestamps) for timestamps in service_events_map.values())
+        processes = min(len(service_events_map), self.processes or os.cpu_count() or 1)
+        if (processes > 1 and len(service_events_map) >= _PARALLEL_MIN_SERVICES
+                and n_events >= _PARALLEL_MIN_EVENTS):
+            # Services are independent, so detection parallelizes across processes.
+            tasks = [(service, timestamps, self.expected_interval_seconds, self.allowed_misses)
+                     for service, timestamps in service_events_map.items()]
+            with multiprocessing.Pool(processes) as pool:
+                for service, service_alerts in pool.imap(_detect_service, tasks):
+                    for alert_time in service_alerts:
+                        yield {'service': service, 'alert_at': _format_epoch(alert_time)}
+        else:
+            for service, timestamps in service_events_map.items():
+                for alert_time in self.detect_missed_heartbeats(timestamps):
+                    yield {'service': service, 'alert_at': _format_epoch(alert_time)}
+
+    def monitor_heartbeats(self, events: Iterable[Dict[str, Any]]) -> List[Dict[str, str]]:
+        return list(self.iter_alerts(events))
+
+
+def _materialize(value: Any) -> Any:
+    if isinstance(value, simdjson.Object):
+        return value.as_dict()
+    if isinstance(value, simdjson.Array):
+        return value.as_list()
+    return value
+
+
+def _project_events(doc: Any) -> Any:
+    if not isinstance(doc, simdjson.Array):
+        return _materialize(doc)
+    events = []
+    for element in doc:
+        if isinstance(element, simdjson.Object):
+            events.append({key: _materialize(element[key])
+                           for key in _PROJECTED_KEYS if key in element})
+        else:
+            events.append(_materialize(element))
+    return events
+
+
+class EventsFileError(Exception):
+    pass
+
+
+def _intern_services(events: Any) -> Any:
+    # Every loaded event holds its own copy of a handful of service names;
+    # interning collapses them to one string per service.
+    if not isinstance(events, list):
+        return events
+    intern = sys.intern
+    for event in events:
+        if type(event) is dict:
+            service = event.get('service')
+            if type(service) is str:
+                event['service'] = intern(service)
+    return events
+
+
+def _read_events(filename: str) -> Any:
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if simdjson is not None:
+        return _intern_services(_project_events(simdjson.Parser().parse(data)))
+    return _intern_services(_loads(data))
 
 
 def load_events_from_file(filename: str) -> List[Dict[str, Any]]:
     try:
-        with open(filename, 'r') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError) as e:
+        return _read_events(filename)
+    except (FileNotFoundError, ValueError) as e:
         print(f"Error loading events from {filename}: {e}")
         return []
 
 
+def _stream_events(filename: str) -> Iterator[Any]:
+    # Yields events one at a time so memory does not scale with the file size.
+    # A missing or damaged file raises EventsFileError, even after some events
+    # were yielded, so callers cannot mistake a partial read for a complete one.
+    load_errors = (FileNotFoundError, ValueError) + ((ijson.JSONError,) if ijson else ())
+    try:
+        if ijson is None:
+            events = _read_events(filename)
+            # Only a top-level array holds events, matching ijson's 'item' prefix.
+            if isinstance(events, list):
+                yield from events
+        else:
+            with open(filename, 'rb') as f:
+                # Floats, not Decimal, so events serialize like the other loaders.
+                yield from ijson.items(f, 'item', use_float=True)
+    except load_errors as e:
+        raise EventsFileError(f"Error loading events from {filename}: {e}") from e
+
+
 def main():
     parser = argparse.ArgumentParser(description='Monitor service heartbeats')
     parser.add_argument('--events-file', default='events.json',
@@ -103,33 +386,54 @@ def main():
                         help='Number of consecutive misses before alert')
     parser.add_argument('--output-file', default='alerts.json',
                         help='File to store alerts output')
+    parser.add_argument('--processes', type=int, default=1,
+                        help='Worker processes for detection on large inputs (0 = one per CPU)')
 
     args = parser.parse_args()
-    events = load_events_from_file(args.events_file)
-    if not events:
+    events = _stream_events(args.events_file)
+    try:
+        first_event = next(events)
+    except StopIteration:
         print("No valid events found.")
         return
+    except EventsFileError as e:
+        print(e)
+        sys.exit(1)
+    events = itertools.chain((first_event,), events)
 
     monitor = HeartbeatMonitor(
         expected_interval_seconds=args.interval,
-        allowed_misses=args.allowed_misses
+        allowed_misses=args.allowed_misses,
+        processes=args.processes or None
     )
-    alerts = monitor.monitor_heartbeats(events)
-
-    # Print to console
-    if alerts:
-        print("Alerts triggered:")
-        print(json.dumps(alerts, indent=2))
-    else:
-        print("No alerts triggered.")
+    # Read and group every event before touching the output file, so a
+    # damaged events file never clobbers the alerts of a previous run.
+    try:
+        service_events_map = monitor.sort_events_by_service(events)
+    except EventsFileError as e:
+        print(e)
+        sys.exit(1)
 
-    # Save to output file
+    # Alerts are written as line-delimited JSON while they are produced, so
+    # memory use does not grow with the number of alerts.
+    alert_count = 0
     try:
-        with open(args.output_file, "w") as outfile:
-            json.dump(alerts, outfile, indent=2)
-        print(f"Alerts saved to {args.output_file}")
-    except Exception as e:
+        with open(args.output_file, "wb") as outfile:
+            for alert in monitor.iter_grouped_alerts(service_events_map):
+                line = _dumps_line(alert)
+                if not alert_count:
+                    print("Alerts triggered:")
+                print(line.decode('utf-8'))
+                outfile.write(line)
+                outfile.write(b'\n')
+                alert_count += 1
+    except OSError as e:
         print(f"Error saving alerts to {args.output_file}: {e}")
+        return
+
+    if not alert_count:
+        print("No alerts triggered.")
+    print(f"Alerts saved to {args.output_file}")
 
 
 if __name__ == '__main__':
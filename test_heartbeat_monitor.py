@@ -3,9 +3,20 @@
 Test cases for the Heartbeat Monitoring System
 """
 
+import contextlib
+import copy
+import importlib.util
+import io
+import json
+import os
+import sys
+import tempfile
 import unittest
+from unittest import mock
 from datetime import datetime
-from main import HeartbeatMonitor
+
+import main
+from main import EventsFileError, HeartbeatMonitor, load_events_from_file, _stream_events
 
 
 class TestHeartbeatMonitor(unittest.TestCase):
@@ -93,6 +104,17 @@ class TestHeartbeatMonitor(unittest.TestCase):
         ts3 = self.monitor.parse_timestamp(None)
         self.assertIsNone(ts3)
     
+    def test_timestamp_prescreen(self):
+        """Test that only strings shaped like an ISO date and time are parsed"""
+        self.assertIsInstance(self.monitor.parse_timestamp("2025-08-04 10:00:00Z"), datetime)
+        self.assertIsInstance(self.monitor.parse_timestamp("2025-08-04T10:00:00.250+02:00"), datetime)
+        self.assertIsNone(self.monitor.parse_timestamp(""))
+        self.assertIsNone(self.monitor.parse_timestamp("2025-08-04"))
+        self.assertIsNone(self.monitor.parse_timestamp("2025-13-04T10:00:00Z"))
+        self.assertIsNone(self.monitor.parse_timestamp("2025-08-04T24:00:00Z"))
+        self.assertIsNone(self.monitor.parse_timestamp("9999-12-31T24:00:00Z"))
+        self.assertIsNone(self.monitor.parse_timestamp("2025-08-04T10:00:00z"))
+
     def test_event_validation(self):
         """Test event validation functionality"""
         # Valid event
@@ -170,6 +192,402 @@ class TestHeartbeatMonitor(unittest.TestCase):
         self.assertEqual(len(alerts), 1)
         self.assertEqual(alerts[0]['alert_at'], '2025-08-04T10:03:00Z')
 
+    def test_timezone_offsets(self):
+        """Test that offset timestamps are compared as instants and alerts are reported in UTC"""
+        events = [
+            {"service": "test", "timestamp": "2025-08-04T12:00:00+02:00"},
+            {"service": "test", "timestamp": "2025-08-04T10:01:00Z"},
+            # Missing heartbeats at 10:02, 10:03, 10:04 UTC
+            {"service": "test", "timestamp": "2025-08-04T12:05:00+02:00"},
+        ]
+
+        alerts = self.monitor.monitor_heartbeats(events)
+
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0]['alert_at'], '2025-08-04T10:04:00Z')
+
+    def test_early_heartbeats_advance_schedule(self):
+        """Test that each early heartbeat still accounts for one expected heartbeat"""
+        events = [
+            {"service": "test", "timestamp": "2025-08-04T10:00:00Z"},
+            # Covers the heartbeats expected at 10:01 and 10:02
+            {"service": "test", "timestamp": "2025-08-04T10:00:10Z"},
+            {"service": "test", "timestamp": "2025-08-04T10:00:20Z"},
+            # Missing heartbeats at 10:03, 10:04 (only 2 misses)
+            {"service": "test", "timestamp": "2025-08-04T10:05:00Z"},
+        ]
+
+        alerts = self.monitor.monitor_heartbeats(events)
+
+        self.assertEqual(len(alerts), 0)
+
+    def test_events_grouped_without_copies(self):
+        """Test that grouping keeps only timestamps and leaves input events untouched"""
+        events = [
+            {"service": "email", "timestamp": "2025-08-04T10:01:00Z", "id": 2},
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z", "id": 1},
+        ]
+        original = copy.deepcopy(events)
+
+        service_events = self.monitor.sort_events_by_service(events)
+
+        self.assertEqual(events, original)
+        self.assertEqual(list(service_events), ['email'])
+        self.assertEqual(list(service_events['email']), [1754301600, 1754301660])
+
+    def test_iterable_input(self):
+        """Test that events can be consumed from a generator"""
+        events = (
+            {"service": "email", "timestamp": f"2025-08-04T10:0{minute}:00Z"}
+            for minute in (0, 1, 5)
+        )
+
+        alerts = self.monitor.monitor_heartbeats(events)
+
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0]['alert_at'], '2025-08-04T10:04:00Z')
+
+    def test_parallel_detection_matches_sequential(self):
+        """Test that detecting across worker processes gives the same alerts in the same order"""
+        events = []
+        for service in ("email", "sms", "push"):
+            events.append({"service": service, "timestamp": "2025-08-04T10:00:00Z"})
+            events.append({"service": service, "timestamp": "2025-08-04T10:05:00Z"})
+            events.append({"service": service, "timestamp": "2025-08-04T10:20:00Z"})
+
+        sequential = self.monitor.monitor_heartbeats(events)
+        monitor = HeartbeatMonitor(expected_interval_seconds=60, allowed_misses=3, processes=2)
+        with mock.patch.object(main, '_PARALLEL_MIN_SERVICES', 1), \
+                mock.patch.object(main, '_PARALLEL_MIN_EVENTS', 1):
+            parallel = monitor.monitor_heartbeats(events)
+
+        self.assertEqual(len(sequential), 15)
+        self.assertEqual(parallel, sequential)
+
+    def test_no_worker_processes_by_default(self):
+        """Test that detection stays in-process unless worker processes are requested"""
+        events = [
+            {"service": service, "timestamp": "2025-08-04T10:00:00Z"}
+            for service in ("email", "sms", "push")
+        ]
+
+        with mock.patch.object(main, '_PARALLEL_MIN_SERVICES', 1), \
+                mock.patch.object(main, '_PARALLEL_MIN_EVENTS', 1), \
+                mock.patch.object(main.multiprocessing, 'Pool') as pool:
+            self.monitor.monitor_heartbeats(events)
+
+        pool.assert_not_called()
+
+    def test_iter_alerts_is_lazy(self):
+        """Test that alerts for later services are not computed until they are consumed"""
+        events = [
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "email", "timestamp": "2025-08-04T10:08:00Z"},
+            {"service": "sms", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "sms", "timestamp": "2025-08-04T10:05:00Z"},
+        ]
+
+        with mock.patch.object(self.monitor, 'detect_missed_heartbeats',
+                               wraps=self.monitor.detect_missed_heartbeats) as detect:
+            alerts = self.monitor.iter_alerts(events)
+            self.assertEqual(detect.call_count, 0)
+
+            self.assertEqual(next(alerts), {'service': 'email', 'alert_at': '2025-08-04T10:03:00Z'})
+            self.assertEqual(detect.call_count, 1)
+
+            self.assertEqual(list(alerts), [
+                {'service': 'email', 'alert_at': '2025-08-04T10:06:00Z'},
+                {'service': 'sms', 'alert_at': '2025-08-04T10:03:00Z'},
+            ])
+            self.assertEqual(detect.call_count, 2)
+
+
+# (timestamps, interval, allowed_misses) shared by the detection backend tests
+DETECTION_CASES = [
+    # Early heartbeats each use up one expected slot
+    ([0, 10, 20, 300], 60, 3),
+    ([0, 10, 20, 400], 60, 3),
+    # Long gaps with several alerts per gap
+    ([0, 60, 1260, 1320, 3000], 60, 3),
+    ([0, 60, 1260, 1320, 3000], 60, 1),
+    ([0, 60, 1260, 1320, 3000], 60, 0),
+    ([0, 30, 30, 30, 900, 905], 30, 2),
+    # Single and duplicate heartbeats
+    ([100], 60, 3),
+    ([0, 0, 0, 500], 60, 0),
+]
+
+
+@unittest.skipIf(main.np is None, "numpy is not installed")
+class TestDetectionBackends(unittest.TestCase):
+    """Test cases comparing the array detection backends with the list loop"""
+
+    def test_numpy_matches_list_loop(self):
+        """Test that vectorized numpy detection gives the same alerts as the list loop"""
+        for timestamps, interval, allowed_misses in DETECTION_CASES:
+            with self.subTest(timestamps=timestamps, interval=interval,
+                              allowed_misses=allowed_misses):
+                expected = main._detect_missed(list(timestamps), interval, allowed_misses)
+                array = main.np.array(timestamps, dtype=main.np.int64)
+
+                alerts = main._detect_numpy(array, interval, allowed_misses)
+
+                self.assertEqual(alerts, expected)
+
+    def test_kernel_matches_list_loop(self):
+        """Test that the numba kernel, run as plain Python, gives the same alerts as the list loop"""
+        for timestamps, interval, allowed_misses in DETECTION_CASES:
+            with self.subTest(timestamps=timestamps, interval=interval,
+                              allowed_misses=allowed_misses):
+                expected = main._detect_missed(list(timestamps), interval, allowed_misses)
+                array = main.np.array(timestamps, dtype=main.np.int64)
+
+                alerts = main._detect_kernel(array, interval, max(allowed_misses, 1))
+
+                self.assertEqual(alerts.tolist(), expected)
+
+    @unittest.skipIf(importlib.util.find_spec('numba') is None, "numba is not installed")
+    def test_compiled_kernel_matches_list_loop(self):
+        """Test that the numba-compiled kernel gives the same alerts as the list loop"""
+        detect_jit = main._get_detect_jit()
+        self.assertTrue(detect_jit)
+        for timestamps, interval, allowed_misses in DETECTION_CASES:
+            with self.subTest(timestamps=timestamps, interval=interval,
+                              allowed_misses=allowed_misses):
+                expected = main._detect_missed(list(timestamps), interval, allowed_misses)
+                array = main.np.array(timestamps, dtype=main.np.int64)
+
+                alerts = detect_jit(array, interval, max(allowed_misses, 1))
+
+                self.assertEqual(alerts.tolist(), expected)
+
+    def test_list_loop_reference_alerts(self):
+        """Test the list loop itself on a gap that yields several alerts"""
+        self.assertEqual(main._detect_missed([0, 60, 1260, 1320, 3000], 60, 3),
+                         [240, 420, 600, 780, 960, 1140, 1500, 1680, 1860,
+                          2040, 2220, 2400, 2580, 2760, 2940])
+
+
+@unittest.skipIf(main.heartbeat_core is None, "heartbeat_core extension is not built")
+class TestHeartbeatCore(unittest.TestCase):
+    """Test cases for the compiled heartbeat_core extension"""
+
+    def setUp(self):
+        """Set up test fixtures"""
+        self.monitor = HeartbeatMonitor(expected_interval_seconds=60, allowed_misses=3)
+
+    def test_group_and_sort_matches_python(self):
+        """Test that the built-in parser agrees with the Python timestamp parser"""
+        timestamps = [
+            "2025-08-04T10:00:00Z",
+            "2024-02-29 23:59:59",
+            "2025-08-04T12:00:00+02:00",
+            "2025-08-04T05:30:00-05:30",
+            "2025-08-04T10:00:00.500Z",  # Handled by the Python fallback
+            "2025-02-29T10:00:00Z",  # Invalid date
+            "2025-08-04T24:00:00Z",  # Invalid hour
+            "not-a-timestamp",
+        ]
+        events = [{"service": "test", "timestamp": ts} for ts in timestamps]
+        expected = sorted(epoch for epoch in map(self.monitor._parse_epoch, timestamps)
+                          if epoch is not None)
+
+        service_events = main.heartbeat_core.group_and_sort(events, self.monitor._parse_epoch)
+
+        self.assertEqual(service_events['test'].tolist(), expected)
+
+    def test_detect_matches_python(self):
+        """Test that compiled detection gives the same alerts as the Python loop"""
+        timestamps = [0, 10, 20, 300, 1260, 1320, 1500]
+        expected = main._detect_missed(timestamps, 60, 3)
+
+        alerts = main.heartbeat_core.detect(main.np.array(timestamps, dtype=main.np.int64), 60, 3)
+
+        self.assertEqual(alerts.tolist(), expected)
+        self.assertEqual(len(expected), 5)
+
+
+class TestLoadEvents(unittest.TestCase):
+    """Test cases for loading events from a file"""
+
+    def setUp(self):
+        """Set up a temporary directory for event files"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, content):
+        """Write raw content to a temporary events file and return its path"""
+        path = os.path.join(self.tmpdir.name, 'events.json')
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+
+    def test_load_valid_file(self):
+        """Test loading a well-formed events file"""
+        events = [
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "sms", "timestamp": "2025-08-04T10:01:00Z"},
+        ]
+        path = self.write_file(json.dumps(events))
+
+        self.assertEqual(load_events_from_file(path), events)
+
+    def test_load_interns_service_names(self):
+        """Test that events loaded from a file share one string per service name"""
+        events = [
+            {"service": "email-notifications", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "email-notifications", "timestamp": "2025-08-04T10:01:00Z"},
+        ]
+        path = self.write_file(json.dumps(events))
+
+        loaded = load_events_from_file(path)
+
+        self.assertIs(loaded[0]['service'], loaded[1]['service'])
+
+    @unittest.skipIf(main.simdjson is None, "pysimdjson is not installed")
+    def test_load_projects_event_fields(self):
+        """Test that the simdjson loader keeps only service and timestamp"""
+        events = [
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z",
+             "region": "eu", "latency_ms": 12},
+            {"service": {"name": "sms"}, "timestamp": "2025-08-04T10:01:00Z",
+             "meta": {"host": "a1", "tags": ["x", "y"]}},
+            "not an event",
+            ["also", {"not": "an event"}],
+        ]
+        path = self.write_file(json.dumps(events))
+
+        self.assertEqual(load_events_from_file(path), [
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": {"name": "sms"}, "timestamp": "2025-08-04T10:01:00Z"},
+            "not an event",
+            ["also", {"not": "an event"}],
+        ])
+
+    def test_load_invalid_json(self):
+        """Test that invalid JSON yields no events instead of crashing"""
+        path = self.write_file('[{"service": "email",')
+
+        self.assertEqual(load_events_from_file(path), [])
+
+    def test_load_missing_file(self):
+        """Test that a missing file yields no events instead of crashing"""
+        path = os.path.join(self.tmpdir.name, 'missing.json')
+
+        self.assertEqual(load_events_from_file(path), [])
+
+    def test_stream_valid_file(self):
+        """Test streaming events from a well-formed events file"""
+        events = [
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "sms", "timestamp": "2025-08-04T10:01:00Z"},
+        ]
+        path = self.write_file(json.dumps(events))
+
+        self.assertEqual(list(_stream_events(path)), events)
+
+    def test_stream_non_integer_numbers(self):
+        """Test that streamed non-integer numbers are plain floats"""
+        events = [
+            {"service": 1.5, "timestamp": "2025-08-04T10:00:00Z", "load": 0.25},
+        ]
+        path = self.write_file(json.dumps(events))
+
+        streamed = list(_stream_events(path))
+
+        self.assertEqual(streamed, events)
+        self.assertIs(type(streamed[0]['service']), float)
+
+    def test_stream_non_array_document(self):
+        """Test that a document other than an array yields no events"""
+        for content in ('null', '{"service": "email"}', '"email"', '5'):
+            with self.subTest(content=content):
+                path = self.write_file(content)
+
+                self.assertEqual(list(_stream_events(path)), [])
+
+    def test_stream_missing_file(self):
+        """Test that streaming a missing file reports a load error"""
+        path = os.path.join(self.tmpdir.name, 'missing.json')
+
+        with self.assertRaises(EventsFileError):
+            list(_stream_events(path))
+
+    def test_stream_truncated_file(self):
+        """Test that a truncated file is reported instead of treated as a complete read"""
+        events = [
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "email", "timestamp": "2025-08-04T10:05:00Z"},
+        ]
+        path = self.write_file(json.dumps(events)[:-20])
+
+        with self.assertRaises(EventsFileError):
+            list(_stream_events(path))
+
+
+class TestMain(unittest.TestCase):
+    """Test cases for the command line entry point"""
+
+    def setUp(self):
+        """Set up a temporary directory for event and alert files"""
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.events_file = os.path.join(self.tmpdir.name, 'events.json')
+        self.output_file = os.path.join(self.tmpdir.name, 'alerts.json')
+
+    def run_main(self, events):
+        """Run main() on the given events and return the bytes of the output file"""
+        with open(self.events_file, 'w') as f:
+            f.write(events if isinstance(events, str) else json.dumps(events))
+        argv = ['main.py', '--events-file', self.events_file, '--output-file', self.output_file]
+        with mock.patch.object(sys, 'argv', argv), \
+                contextlib.redirect_stdout(io.StringIO()):
+            main.main()
+        with open(self.output_file, 'rb') as f:
+            return f.read()
+
+    def test_writes_one_alert_per_line(self):
+        """Test that alerts are saved as compact line-delimited JSON"""
+        events = [
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "email", "timestamp": "2025-08-04T10:08:00Z"},
+            {"service": "sms", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "sms", "timestamp": "2025-08-04T10:04:00Z"},
+        ]
+
+        self.assertEqual(self.run_main(events), (
+            b'{"service":"email","alert_at":"2025-08-04T10:03:00Z"}\n'
+            b'{"service":"email","alert_at":"2025-08-04T10:06:00Z"}\n'
+            b'{"service":"sms","alert_at":"2025-08-04T10:03:00Z"}\n'
+        ))
+
+    def test_no_alerts_writes_empty_file(self):
+        """Test that a run without alerts leaves an empty output file"""
+        events = [
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "email", "timestamp": "2025-08-04T10:01:00Z"},
+        ]
+
+        self.assertEqual(self.run_main(events), b'')
+
+
+    def test_damaged_events_file_keeps_previous_output(self):
+        """Test that a truncated events file exits non-zero and leaves earlier alerts intact"""
+        previous = b'{"service":"email","alert_at":"2025-08-04T10:03:00Z"}\n'
+        with open(self.output_file, 'wb') as f:
+            f.write(previous)
+        events = json.dumps([
+            {"service": "email", "timestamp": "2025-08-04T10:00:00Z"},
+            {"service": "email", "timestamp": "2025-08-04T10:08:00Z"},
+        ])
+
+        with self.assertRaises(SystemExit) as cm:
+            self.run_main(events[:-20])
+
+        self.assertEqual(cm.exception.code, 1)
+        with open(self.output_file, 'rb') as f:
+            self.assertEqual(f.read(), previous)
+
 
 if __name__ == '__main__':
     # Run tests with verbose output